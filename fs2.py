@@ -4,13 +4,70 @@
 # Import necessary libraries
 import tkinter as tk  # For creating graphical user interface
 from tkinter import filedialog, messagebox  # For file selection and message popups
-import paramiko  # For SFTP file transfer protocol
 import os  # For file and path operations
 import time  # For time-related operations
 from tkinter import ttk  # For themed Tkinter widgets
 import threading  # For running file transfers in background
+from concurrent.futures import ThreadPoolExecutor  # For bounding concurrent transfers
+import socket  # For tuning the TCP connection used by SFTP
 import json  # For saving and loading transfer history
-from datetime import datetime  # For timestamp generation
+import queue  # For passing UI updates from worker threads to the main thread
+import uuid  # For unique history entry ids
+
+try:
+    import orjson  # Faster JSON encoding and decoding, used when installed
+except ImportError:
+    orjson = None
+
+# Size of each chunk read from the local file during upload (1 MiB)
+TRANSFER_CHUNK_SIZE = 1 << 20
+# Largest SFTP write request sent to the server; OpenSSH rejects packets over 256 KiB
+SFTP_WRITE_REQUEST_SIZE = 252 * 1024
+# Number of read requests kept in flight while prefetching a download
+MAX_PREFETCH_REQUESTS = 64
+# TCP send/receive buffer size, large enough for high-latency links (32 MiB)
+SOCKET_BUFFER_SIZE = 32 * 1024 * 1024
+# Maximum number of transfers running at the same time
+MAX_CONCURRENT_TRANSFERS = 4
+# History file used by older versions, converted on first start
+LEGACY_HISTORY_FILE = "transfer_history.json"
+# Minimum number of seconds between two progress bar updates (~30 per second)
+PROGRESS_UPDATE_INTERVAL = 0.033
+# Number of times an interrupted transfer is reconnected and resumed
+MAX_TRANSFER_RETRIES = 3
+# Seconds to wait before the first reconnect; doubled, tripled for later ones
+RETRY_BACKOFF = 1.0
+# Format of the timestamp stored with each history entry
+HISTORY_DATE_FORMAT = "%Y-%m-%d %H:%M"
+# Seconds to wait for the TCP connection to the server
+CONNECT_TIMEOUT = 10
+# Milliseconds between checks for UI updates queued by transfer threads
+UI_DRAIN_INTERVAL_MS = 50
+
+
+def _encode_entry(entry):
+    """
+    Encode a history entry as one compact line of JSON
+
+    :param entry: History entry to encode
+    :return: JSON text without a trailing newline
+    """
+    if orjson is not None:
+        return orjson.dumps(entry).decode("utf-8")
+    return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+def _decode_json(text):
+    """
+    Decode JSON text, using orjson when it is installed
+
+    :param text: JSON text to decode
+    :return: Decoded value
+    :raises ValueError: If the text is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
 
 
 class FileSharingApp:
@@ -38,10 +95,29 @@ class FileSharingApp:
         self.root.geometry("400x800")  # Wide enough for all components
         self.root.resizable(False, False)  # Prevent window resizing
 
-        # File to store transfer history
-        self.history_file = "transfer_history.json"
+        # File to store transfer history, one JSON entry per line
+        self.history_file = "transfer_history.jsonl"
         # Load existing transfer history
         self.transfer_history = self.load_history()
+        # Long-lived handle used to append new history entries
+        self._hist_fp = open(self.history_file, "a", encoding="utf-8")
+
+        # Authenticated SSH transports keyed by (server, username), reused across transfers
+        self._transport_cache = {}
+        self._transport_lock = threading.Lock()
+        # Events for connections in progress, keyed like the transport cache
+        self._transport_pending = {}
+        # Per-thread SFTP channels opened on the cached transports
+        self._sftp_local = threading.local()
+        # Import paramiko in the background so the window opens without
+        # waiting for it and the first transfer does not pay for it either
+        threading.Thread(target=__import__, args=("paramiko",), daemon=True).start()
+        # Worker pool that limits how many transfers run at the same time
+        self._pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_TRANSFERS)
+        # Set when the window is closing so transfers stop reconnecting
+        self._closing = threading.Event()
+        # Close cached connections when the window is closed
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Create main container frame
         main_frame = ttk.Frame(root)
@@ -97,10 +173,19 @@ class FileSharingApp:
         )
         self.upload_status_label.pack()
 
-        # Button to select file for upload
+        # Files selected for upload and their cached base names
+        self.file_paths = []
+        self.file_basenames = []
+
+        # Buttons to select a single file or several files for upload
+        select_frame = ttk.Frame(main_frame)
+        select_frame.pack(pady=10)
         ttk.Button(
-            main_frame, text="انتخاب فایل", command=self.select_file, width=20
-        ).pack(pady=10)
+            select_frame, text="انتخاب فایل", command=self.select_file, width=15
+        ).pack(side="left", padx=5)
+        ttk.Button(
+            select_frame, text="انتخاب چند فایل", command=self.select_files, width=15
+        ).pack(side="left", padx=5)
 
         # Label to show selected file details
         self.file_label = ttk.Label(
@@ -211,7 +296,12 @@ class FileSharingApp:
         self.status_label.pack(pady=10)
 
         # Load and display existing transfer history
-        self.update_history_display()
+        self._refresh_full()
+
+        # Updates from transfer threads, applied on the main thread since
+        # Tkinter widgets must not be touched from other threads
+        self._ui_queue = queue.Queue()
+        self._drain_ui()
 
     def select_file(self):
         """
@@ -221,11 +311,38 @@ class FileSharingApp:
         # Open file selection dialog
         self.file_path = filedialog.askopenfilename()
 
-        # Update file label with selected file info
+        # Cache the selected file's name and size, then update file label
         if self.file_path:
-            file_size = os.path.getsize(self.file_path)
+            self.file_basename = os.path.basename(self.file_path)
+            self.file_size = os.stat(self.file_path).st_size
+            self.file_paths = [self.file_path]
+            self.file_basenames = [self.file_basename]
             self.file_label.config(
-                text=f"انتخاب شده: {os.path.basename(self.file_path)} ({file_size} bytes)"
+                text=f"انتخاب شده: {self.file_basename} ({self.file_size} bytes)"
+            )
+        else:
+            self.file_paths = []
+            self.file_basenames = []
+            self.file_label.config(text="فایلی انتخاب نشده")
+
+    def select_files(self):
+        """
+        Open file dialog to select several files for upload
+        The files are uploaded one after another over a single SFTP session
+        """
+        # Open multiple file selection dialog
+        self.file_paths = list(filedialog.askopenfilenames())
+        self.file_basenames = [os.path.basename(path) for path in self.file_paths]
+        self.file_path = self.file_paths[0] if self.file_paths else ""
+
+        # Update file label with number of selected files
+        if len(self.file_paths) > 1:
+            self.file_label.config(text=f"انتخاب شده: {len(self.file_paths)} فایل")
+        elif self.file_paths:
+            self.file_basename = self.file_basenames[0]
+            self.file_size = os.stat(self.file_path).st_size
+            self.file_label.config(
+                text=f"انتخاب شده: {self.file_basename} ({self.file_size} bytes)"
             )
         else:
             self.file_label.config(text="فایلی انتخاب نشده")
@@ -258,23 +375,17 @@ class FileSharingApp:
         if messagebox.askyesno(
             "Delete", "آیا مطمئن هستید که می‌خواهید موارد انتخاب شده را حذف کنید؟"
         ):
-            # Remove selected items from history
-            for item_id in selected_items:
-                item_values = self.history_tree.item(item_id)["values"]
-                # Find and remove corresponding entry
-                for i, entry in enumerate(self.transfer_history):
-                    if (
-                        entry["date"] == item_values[0]
-                        and entry["file"] == item_values[2]
-                        and entry["status"]
-                        == ("success" if item_values[3] == "موفق" else "failed")
-                    ):
-                        del self.transfer_history[i]
-                        break
+            # Tree rows use the entry id as their item id
+            selected = set(selected_items)
+
+            # Remove the selected entries from history in a single pass
+            self.transfer_history = [
+                entry for entry in self.transfer_history if entry["id"] not in selected
+            ]
+            self.history_tree.delete(*selected)
 
-            # Save and update history
+            # Save history
             self.save_history()
-            self.update_history_display()
 
     def update_progress(self, transferred, total):
         """
@@ -289,73 +400,188 @@ class FileSharingApp:
         self.progress_label.config(
             text=f"{percentage:.1f}% ({transferred}/{total} bytes)"
         )
-        self.root.update_idletasks()
 
     def load_history(self):
         """
-        Load transfer history from JSON file
+        Load transfer history from JSON lines file
+
+        A history file from an older version is converted on first start.
 
         :return: List of transfer history entries
         """
         try:
+            # Convert the old single JSON document to one entry per line
+            if not os.path.exists(self.history_file) and os.path.exists(
+                LEGACY_HISTORY_FILE
+            ):
+                with open(LEGACY_HISTORY_FILE, "r", encoding="utf-8") as f:
+                    history = _decode_json(f.read())
+                for entry in history:
+                    entry["id"] = uuid.uuid4().hex
+                self._write_history_file(history)
+                return history
+
             # Read history from file if it exists
+            history = []
+            damaged = False
             if os.path.exists(self.history_file):
                 with open(self.history_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            return []
+                    for line in f:
+                        # A last line without newline was cut off mid-write
+                        if not line.endswith("\n"):
+                            damaged = True
+                        try:
+                            history.append(_decode_json(line))
+                        except ValueError:
+                            # Skip a line left incomplete by an interrupted write
+                            damaged = True
+                            continue
+
+            # Entries written by older versions have no id yet
+            for entry in history:
+                entry.setdefault("id", uuid.uuid4().hex)
+
+            # Rewrite a damaged file so the next append starts on its own line
+            if damaged:
+                self._write_history_file(history)
+            return history
         except:
             # Return empty list if file can't be read
             return []
 
     def save_history(self):
         """
-        Save transfer history to JSON file
+        Rewrite the whole history file from the in-memory history
+
+        Only needed when entries are removed; new entries are appended
+        by add_to_history.
         """
-        # Write transfer history to file
-        with open(self.history_file, "w", encoding="utf-8") as f:
-            json.dump(self.transfer_history, f, ensure_ascii=False, indent=2)
+        # Write transfer history to file and reopen the append handle, even
+        # if the rewrite failed, so later appends still have a handle
+        self._hist_fp.close()
+        try:
+            self._write_history_file(self.transfer_history)
+        finally:
+            self._hist_fp = open(self.history_file, "a", encoding="utf-8")
 
-    def add_to_history(self, transfer_type, filename, status):
+    def _write_history_file(self, entries):
+        """
+        Atomically replace the history file with the given entries
+
+        The entries are written compactly to a temporary file which is then
+        moved over the history file, so a crash never leaves it half written.
+
+        :param entries: List of transfer history entries
+        """
+        tmp_file = self.history_file + ".tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(_encode_entry(entry) + "\n")
+        os.replace(tmp_file, self.history_file)
+
+    def add_to_history(self, transfer_type, filename, status, ts=None):
         """
         Add a new transfer entry to history
 
+        Safe to call from transfer worker threads: the entry is queued and
+        recorded on the main thread by _drain_ui.
+
         :param transfer_type: 'upload' or 'download'
         :param filename: Name of transferred file
         :param status: 'success' or 'failed'
+        :param ts: Preformatted timestamp shared by a batch; defaults to now
+        """
+        # Create new history entry with the given or current timestamp
+        if ts is None:
+            ts = time.strftime(HISTORY_DATE_FORMAT)
+        entry = {
+            "id": uuid.uuid4().hex,
+            "date": ts,
+            "type": transfer_type,
+            "file": filename,
+            "status": status,
+        }
+        self._ui_queue.put(("history", entry))
+
+    def _record_history(self, entry):
+        """
+        Store a new history entry and show it; must run on the main thread
+
+        :param entry: History entry to record
+        """
+        self.transfer_history.append(entry)
+
+        # Show the new entry at the top of the history display first, so
+        # the tree matches the in-memory history even if the write fails
+        self._append_history_row(entry)
+
+        # Append only the new entry instead of rewriting the file
+        self._hist_fp.write(_encode_entry(entry) + "\n")
+        self._hist_fp.flush()
+
+    def _drain_ui(self):
+        """
+        Apply pending UI updates from worker threads and reschedule itself
+        """
+        # Always reschedule, so one failing update doesn't stop later ones
+        try:
+            self._process_ui_queue()
+        finally:
+            self._drain_job = self.root.after(UI_DRAIN_INTERVAL_MS, self._drain_ui)
+
+    def _process_ui_queue(self):
         """
-        # Create new history entry with current timestamp
-        self.transfer_history.append(
-            {
-                "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "type": transfer_type,
-                "file": filename,
-                "status": status,
-            }
+        Apply every UI update queued by worker threads
+        """
+        while True:
+            try:
+                kind, payload = self._ui_queue.get_nowait()
+            except queue.Empty:
+                return
+            if kind == "history":
+                self._record_history(payload)
+            elif kind == "message":
+                # Open the dialog after the queue is drained, since it blocks
+                self.root.after_idle(*payload)
+
+    def _show_message(self, show, title, text):
+        """
+        Show a message box from a worker thread via the main thread
+
+        :param show: messagebox function such as messagebox.showinfo
+        :param title: Title of the message box
+        :param text: Message to show
+        """
+        self._ui_queue.put(("message", (show, title, text)))
+
+    def _append_history_row(self, entry):
+        """
+        Insert a single history entry at the top of the history treeview
+
+        :param entry: History entry to display
+        """
+        self.history_tree.insert(
+            "",
+            0,
+            iid=entry["id"],
+            values=(
+                entry["date"],
+                "آپلود" if entry["type"] == "upload" else "دانلود",
+                entry["file"],
+                "موفق" if entry["status"] == "success" else "ناموفق",
+            ),
         )
-        # Save and update history display
-        self.save_history()
-        self.update_history_display()
 
-    def update_history_display(self):
+    def _refresh_full(self):
         """
-        Refresh the history treeview with current transfer history
+        Rebuild the history treeview from the whole transfer history
         """
         # Clear existing items in treeview
-        for item in self.history_tree.get_children():
-            self.history_tree.delete(item)
-
-        # Add history items in reverse chronological order
-        for item in reversed(self.transfer_history):
-            self.history_tree.insert(
-                "",
-                "end",
-                values=(
-                    item["date"],
-                    "آپلود" if item["type"] == "upload" else "دانلود",
-                    item["file"],
-                    "موفق" if item["status"] == "success" else "ناموفق",
-                ),
-            )
+        self.history_tree.delete(*self.history_tree.get_children())
+
+        # Add history items so the newest ends up on top
+        for entry in self.transfer_history:
+            self._append_history_row(entry)
 
     def clear_history(self):
         """
@@ -368,27 +594,57 @@ class FileSharingApp:
             # Reset history and update display
             self.transfer_history = []
             self.save_history()
-            self.update_history_display()
+            self._refresh_full()
+
+    def _get_credentials(self):
+        """
+        Read and validate server connection details from the input fields
+
+        Must run on the main thread since it reads Tkinter widgets.
+
+        :return: (server, username, password), or None if any is missing
+        """
+        # Retrieve server connection details from input fields
+        credentials = (
+            self.server_entry.get(),
+            self.username_entry.get(),
+            self.password_entry.get(),
+        )
+
+        # Validate that all connection details are provided
+        if not all(credentials):
+            # Show error if any connection detail is missing
+            messagebox.showerror("Error", "لطفا تمامی مشخصات را پر کنید")
+            return None
+        return credentials
 
     def upload_file(self):
         """
-        Initiate file upload process in a separate thread
+        Initiate file upload process on the transfer worker pool
         """
         # Check if a file is selected
-        if not hasattr(self, "file_path") or not self.file_path:
+        if not self.file_paths:
             messagebox.showerror(
                 "Error", "لطفا فایل مورد نظر برای آپلود را انتخاب کنید!"
             )
             return
 
-        # Start upload in a background thread to prevent UI freezing
-        threading.Thread(
-            target=self._transfer_file, args=("upload",), daemon=True
-        ).start()
+        credentials = self._get_credentials()
+        if credentials is None:
+            return
+
+        # Queue upload on the worker pool to prevent UI freezing
+        # The selection is copied so a new selection doesn't affect this transfer
+        self._pool.submit(
+            self._transfer_file,
+            "upload",
+            credentials,
+            files=list(zip(self.file_paths, self.file_basenames)),
+        )
 
     def download_file(self):
         """
-        Initiate file download process in a separate thread
+        Initiate file download process on the transfer worker pool
         """
         # Get remote filename from input
         remote_file = self.remote_file_entry.get()
@@ -398,113 +654,465 @@ class FileSharingApp:
             )
             return
 
-        # Start download in a background thread
-        threading.Thread(
-            target=self._transfer_file,
-            args=("download",),
-            kwargs={"remote_file": remote_file},
-            daemon=True,
-        ).start()
+        credentials = self._get_credentials()
+        if credentials is None:
+            return
+
+        # Open save file dialog to choose download location
+        save_path = filedialog.asksaveasfilename(initialfile=remote_file)
+
+        # Cancel download if no save path selected
+        if not save_path:
+            self.status_label.config(text="دانلود متوقف شد", foreground="red")
+            self.add_to_history("download", remote_file, "failed")
+            return
+
+        # Queue download on the worker pool
+        self._pool.submit(
+            self._transfer_file,
+            "download",
+            credentials,
+            remote_file=remote_file,
+            save_path=save_path,
+        )
+
+    def _open_socket(self, server):
+        """
+        Connect a tuned TCP socket to the SSH port of the server
+
+        Every address the server name resolves to (IPv4 or IPv6) is tried in
+        turn. Nagle is disabled and the socket buffers are enlarged before
+        connecting so the larger TCP window is negotiated.
 
-    def _transfer_file(self, action, remote_file=None):
+        :param server: Server address
+        :return: Connected socket
+        :raises OSError: If no address could be connected to
+        """
+        error = None
+        # Uses standard SSH port 22
+        for family, socktype, proto, _, address in socket.getaddrinfo(
+            server, 22, 0, socket.SOCK_STREAM
+        ):
+            sock = socket.socket(family, socktype, proto)
+            # Don't wait for the OS connect timeout on unreachable hosts;
+            # paramiko.Transport sets its own timeout once it takes over
+            sock.settimeout(CONNECT_TIMEOUT)
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+                sock.connect(address)
+                return sock
+            except OSError as e:
+                # Close the failed socket and try the next address
+                sock.close()
+                error = e
+        raise error
+
+    def _connect_transport(self, server, username, password):
+        """
+        Open a new authenticated SSH transport to the server
+
+        :param server: Server address
+        :param username: Username for authentication
+        :param password: Password for authentication
+        :return: paramiko.Transport
+        """
+        # paramiko is imported on first use to keep startup fast
+        import paramiko
+
+        # Open the TCP connection ourselves so Nagle can be disabled and
+        # the socket buffers enlarged before the handshake
+        sock = self._open_socket(server)
+
+        # Create SSH transport over the tuned socket and authenticate
+        try:
+            transport = paramiko.Transport(sock)
+        except Exception:
+            sock.close()
+            raise
+        try:
+            transport.connect(username=username, password=password)
+        except Exception:
+            transport.close()
+            raise
+        return transport
+
+    def _get_transport(self, server, username, password):
+        """
+        Return an authenticated SSH transport for the given server and user
+
+        The transport is cached and shared by all transfer workers so the
+        TCP connection and SSH handshake are only paid once. A new
+        connection is made if the cached transport is no longer active.
+
+        The cache lock is only held to read and update the cache; the
+        connection itself is made outside it, and workers asking for the
+        same server wait for the one already connecting.
+
+        :param server: Server address
+        :param username: Username for authentication
+        :param password: Password for authentication
+        :return: paramiko.Transport
+        """
+        key = (server, username)
+        while True:
+            stale = None
+            with self._transport_lock:
+                # Reuse the cached transport while it is still alive
+                transport = self._transport_cache.get(key)
+                if transport is not None and transport.is_active():
+                    return transport
+                if transport is not None:
+                    stale = self._transport_cache.pop(key)
+
+                # Don't open new connections while the application is closing
+                if self._closing.is_set():
+                    raise ConnectionAbortedError("application is closing")
+
+                # Wait for another worker already connecting to this server
+                pending = self._transport_pending.get(key)
+                connecting = pending is None
+                if connecting:
+                    pending = self._transport_pending[key] = threading.Event()
+
+            if stale is not None:
+                stale.close()
+            if not connecting:
+                # Check the cache again, and connect ourselves if that failed
+                pending.wait()
+                continue
+
+            try:
+                transport = self._connect_transport(server, username, password)
+                with self._transport_lock:
+                    if not self._closing.is_set():
+                        self._transport_cache[key] = transport
+                        return transport
+                # The window was closed while connecting
+                transport.close()
+                raise ConnectionAbortedError("application is closing")
+            finally:
+                with self._transport_lock:
+                    del self._transport_pending[key]
+                pending.set()
+
+    def _get_sftp(self, server, username, password):
+        """
+        Return an SFTP client for the calling worker thread
+
+        Each worker keeps its own SFTP channel, all opened over the shared
+        cached transport, so concurrent transfers do not interleave requests
+        on a single channel.
+
+        :param server: Server address
+        :param username: Username for authentication
+        :param password: Password for authentication
+        :return: paramiko.SFTPClient
+        """
+        import paramiko
+
+        transport = self._get_transport(server, username, password)
+
+        # SFTP clients opened by this thread, keyed by (server, username)
+        clients = getattr(self._sftp_local, "clients", None)
+        if clients is None:
+            clients = self._sftp_local.clients = {}
+        key = (server, username)
+        sftp = clients.get(key)
+        if sftp is not None and sftp.get_channel().get_transport() is transport:
+            if not sftp.get_channel().closed:
+                return sftp
+
+        # Open a new SFTP channel on the shared transport
+        sftp = paramiko.SFTPClient.from_transport(transport)
+        clients[key] = sftp
+        return sftp
+
+    def on_close(self):
+        """
+        Stop pending transfers, close open connections and files, destroy the window
+        """
+        # Stop running transfers from retrying once their transport is closed
+        self._closing.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        # Take the cached transports without waiting for connections in
+        # progress; those are rejected by the _closing check when they finish
+        with self._transport_lock:
+            transports = list(self._transport_cache.values())
+            self._transport_cache.clear()
+        # Closing a transport also closes every SFTP channel opened on it
+        for transport in transports:
+            transport.close()
+        # Record history from transfers that finished since the last drain
+        self.root.after_cancel(self._drain_job)
+        self._process_ui_queue()
+        self._hist_fp.close()
+        self.root.destroy()
+
+    def _run_resumable(self, server, username, password, transfer):
+        """
+        Run a transfer, reconnecting and resuming it after network errors
+
+        Whether an error is retried depends on the state of the transport
+        rather than the exception class: paramiko reports a dropped
+        connection as SSHException, EOFError or a plain OSError such as
+        "Socket is closed", depending on where the transfer was when the
+        drop was noticed.
+
+        :param server: Server address
+        :param username: Username for authentication
+        :param password: Password for authentication
+        :param transfer: Callable taking an SFTP client that performs the transfer;
+            it is called again with a new client after a reconnect
+        """
+        import paramiko
+
+        # Errors a dropped connection can surface as
+        network_errors = (paramiko.SSHException, EOFError, OSError)
+        # Errors about the files themselves, never fixed by reconnecting
+        file_errors = (
+            FileNotFoundError,
+            FileExistsError,
+            PermissionError,
+            IsADirectoryError,
+            NotADirectoryError,
+        )
+
+        error = None
+        for attempt in range(MAX_TRANSFER_RETRIES + 1):
+            last_attempt = attempt == MAX_TRANSFER_RETRIES
+            if attempt:
+                # Back off before reconnecting; stop early if the window closes
+                if self._closing.wait(RETRY_BACKOFF * attempt):
+                    raise error
+
+            # Reconnect inside the retry, since the server may not be
+            # reachable again the instant after a drop
+            try:
+                sftp = self._get_sftp(server, username, password)
+            except (paramiko.AuthenticationException, ConnectionAbortedError):
+                raise
+            except network_errors as e:
+                # A failing first connect is reported directly
+                if attempt == 0 or last_attempt or isinstance(e, file_errors):
+                    raise
+                error = e
+                continue
+
+            try:
+                return transfer(sftp)
+            except network_errors as e:
+                # Retry only when the connection itself is gone; a dead
+                # transport is replaced by _get_transport, so sibling
+                # transfers sharing a live one are left alone
+                if (
+                    last_attempt
+                    or isinstance(e, file_errors)
+                    or self._closing.is_set()
+                    or sftp.get_channel().get_transport().is_active()
+                ):
+                    raise
+                error = e
+
+    def _put_file(self, sftp, local_path, remote_path, callback, state):
+        """
+        Upload a local file using large pipelined write requests
+
+        :param sftp: SFTP client to upload with
+        :param local_path: Path of the local file
+        :param remote_path: Destination path on the server
+        :param callback: Called with (transferred, total) bytes
+        :param state: Per-transfer dict shared by retries; "opened" is set once
+            the remote file has been created or truncated by this transfer
+        :raises IOError: If the uploaded file has the wrong size
+        """
+        with open(local_path, "rb") as local_file:
+            total = os.fstat(local_file.fileno()).st_size
+
+            # Resume only from a file this transfer opened itself; the server
+            # holds every write it acknowledged before the drop
+            offset = 0
+            if state["opened"]:
+                try:
+                    offset = sftp.stat(remote_path).st_size
+                except FileNotFoundError:
+                    offset = 0
+                if offset > total:
+                    offset = 0
+
+            # Use larger write requests than the 32 KiB blocks used by sftp.put
+            with sftp.open(remote_path, "r+b" if offset else "wb") as remote_handle:
+                state["opened"] = True
+                remote_handle.MAX_REQUEST_SIZE = SFTP_WRITE_REQUEST_SIZE
+                remote_handle.set_pipelined(True)
+                local_file.seek(offset)
+                remote_handle.seek(offset)
+                transferred = offset
+                while True:
+                    data = local_file.read(TRANSFER_CHUNK_SIZE)
+                    if not data:
+                        break
+                    remote_handle.write(data)
+                    transferred += len(data)
+                    callback(transferred, total)
+
+        # Confirm the upload like sftp.put(confirm=True) does
+        remote_size = sftp.stat(remote_path).st_size
+        if remote_size != total:
+            raise IOError(f"size mismatch in upload: {remote_size} != {total}")
+
+    def _get_file(self, sftp, remote_path, save_path, callback, state):
+        """
+        Download a remote file with a bounded number of prefetch requests
+
+        :param sftp: SFTP client to download with
+        :param remote_path: Path of the file on the server
+        :param save_path: Local destination path
+        :param callback: Called with (transferred, total) bytes
+        :param state: Per-transfer dict shared by retries; "opened" is set once
+            the local file has been created or truncated by this transfer
+        :raises IOError: If fewer bytes than the remote size were received
+        """
+        # Resume only from a local file this transfer opened itself
+        offset = 0
+        if state["opened"] and os.path.exists(save_path):
+            offset = os.path.getsize(save_path)
+
+        with sftp.open(remote_path, "rb") as remote_handle:
+            total = remote_handle.stat().st_size
+            if offset > total:
+                offset = 0
+
+            with open(save_path, "ab" if offset else "wb") as local_file:
+                state["opened"] = True
+                remote_handle.seek(offset)
+                # Prefetch the rest of the file with at most 64 reads in flight,
+                # unless it fits in a single read request anyway
+                if total - offset > remote_handle.MAX_REQUEST_SIZE:
+                    remote_handle.prefetch(total, MAX_PREFETCH_REQUESTS)
+                transferred = offset
+                while True:
+                    data = remote_handle.read(TRANSFER_CHUNK_SIZE)
+                    if not data:
+                        break
+                    local_file.write(data)
+                    transferred += len(data)
+                    callback(transferred, total)
+
+        # Confirm the download like sftp.get does
+        if transferred != total:
+            raise IOError(f"size mismatch in download: {transferred} != {total}")
+
+    def _transfer_file(
+        self, action, credentials, remote_file=None, save_path=None, files=None
+    ):
         """
         Manage file transfers via SFTP protocol with progress tracking
 
         This method handles both file uploads and downloads:
-        1. Validates server connection details
-        2. Establishes an SFTP connection
-        3. Performs file transfer with progress updates
-        4. Manages transfer history and user notifications
+        1. Establishes an SFTP connection (or reuses a cached one)
+        2. Performs file transfer with progress updates
+        3. Manages transfer history and user notifications
+
+        Connection details and the download location are collected on the
+        main thread by upload_file and download_file before this is queued.
+
+        Runs on a worker thread, so every widget update and dialog is handed
+        to the main thread through root.after or the UI queue.
 
         :param action: Type of transfer - either 'upload' or 'download'
+        :param credentials: (server, username, password) read on the main thread
         :param remote_file: Name of file to download (only used for download action)
+        :param save_path: Local path to save the download to (only used for download)
+        :param files: (local path, base name) pairs to upload (only used for upload)
         """
-        # Retrieve server connection details from input fields
-        server, username, password = (
-            self.server_entry.get(),
-            self.username_entry.get(),
-            self.password_entry.get(),
-        )
+        server, username, password = credentials
 
-        # Validate that all connection details are provided
-        if not all([server, username, password]):
-            # Show error if any connection detail is missing
-            messagebox.showerror("Error", "لطفا تمامی مشخصات را پر کنید")
-            return
+        # Timestamp shared by every history entry of this transfer
+        ts = time.strftime(HISTORY_DATE_FORMAT)
+
+        # File reported in history if the transfer fails
+        current_file = remote_file if action == "download" else files[0][1]
 
         try:
             # Reset progress bar and label before starting transfer
-            self.progress_bar["value"] = 0
-            self.progress_label.config(text="")
+            self.root.after(0, self.progress_bar.config, {"value": 0})
+            self.root.after(0, self.progress_label.config, {"text": ""})
 
             # Update status to show connection in progress
-            self.status_label.config(text="درحال اتصال...", foreground="blue")
-
-            # Create SFTP transport and connection
-            # Uses standard SSH port 22
-            transport = paramiko.Transport((server, 22))
-            transport.connect(username=username, password=password)
+            self.root.after(
+                0,
+                self.status_label.config,
+                {"text": "درحال اتصال...", "foreground": "blue"},
+            )
 
-            # Create SFTP client from the transport
-            sftp = paramiko.SFTPClient.from_transport(transport)
+            # Time of this transfer's last progress update, used to throttle
+            last_progress_ts = 0.0
+
+            # Create a callback function to update progress bar
+            def callback(transferred, total):
+                nonlocal last_progress_ts
+                # Coalesce updates so the UI is refreshed at most ~30 times a second
+                now = time.monotonic()
+                if (
+                    now - last_progress_ts < PROGRESS_UPDATE_INTERVAL
+                    and transferred != total
+                ):
+                    return
+                last_progress_ts = now
+                # Use root.after to safely update UI from thread
+                self.root.after(0, self.update_progress, transferred, total)
 
             # Handle file upload
             if action == "upload":
-                # Use the filename as the remote path (upload to root directory)
-                remote_path = os.path.basename(self.file_path)
-
-                # Get total file size for progress tracking
-                file_size = os.path.getsize(self.file_path)
-
-                # Create a callback function to update progress bar
-                def callback(transferred, total):
-                    # Use root.after to safely update UI from thread
-                    self.root.after(0, self.update_progress, transferred, total)
+                # Upload every selected file over the same SFTP channel
+                for local_path, current_file in files:
+                    # Use the filename as the remote path (upload to root directory)
+                    remote_path = current_file
+
+                    # Perform the file upload, resuming it after network errors
+                    state = {"opened": False}
+                    self._run_resumable(
+                        server,
+                        username,
+                        password,
+                        lambda sftp: self._put_file(
+                            sftp, local_path, remote_path, callback, state
+                        ),
+                    )
 
-                # Perform the file upload
-                sftp.put(self.file_path, remote_path, callback=callback)
+                    # Record each uploaded file in history
+                    self.add_to_history("upload", current_file, "success", ts)
 
-                # Update UI and history after successful upload
+                # Update UI after successful upload
+                if len(files) == 1:
+                    status_text = f"فایل آپلود شده در {remote_path}"
+                    message = f"File '{current_file}' با موفقیت بارگذاری شد!"
+                else:
+                    status_text = f"{len(files)} فایل آپلود شد"
+                    message = f"{len(files)} فایل با موفقیت بارگذاری شد!"
                 self.root.after(
                     0,
                     self.status_label.config,
-                    {"text": f"فایل آپلود شده در {remote_path}", "foreground": "green"},
-                )
-                self.add_to_history(
-                    "upload", os.path.basename(self.file_path), "success"
+                    {"text": status_text, "foreground": "green"},
                 )
 
                 # Show success message to user
-                messagebox.showinfo(
-                    "Success",
-                    f"File '{os.path.basename(self.file_path)}' با موفقیت بارگذاری شد!",
-                )
+                self._show_message(messagebox.showinfo, "Success", message)
 
             # Handle file download
             elif action == "download":
-                # Open save file dialog to choose download location
-                save_path = filedialog.asksaveasfilename(initialfile=remote_file)
-
-                # Cancel download if no save path selected
-                if not save_path:
-                    self.root.after(
-                        0,
-                        self.status_label.config,
-                        {"text": "دانلود متوقف شد", "foreground": "red"},
-                    )
-                    self.add_to_history("download", remote_file, "failed")
-                    return
-
-                # Get total file size for progress tracking
-                file_size = sftp.stat(remote_file).st_size
-
-                # Create a callback function to update progress bar
-                def callback(transferred, total):
-                    # Use root.after to safely update UI from thread
-                    self.root.after(0, self.update_progress, transferred, total)
-
-                # Perform the file download
-                sftp.get(remote_file, save_path, callback=callback)
+                # Perform the file download, resuming it after network errors
+                state = {"opened": False}
+                self._run_resumable(
+                    server,
+                    username,
+                    password,
+                    lambda sftp: self._get_file(
+                        sftp, remote_file, save_path, callback, state
+                    ),
+                )
 
                 # Update UI and history after successful download
                 self.root.after(
@@ -512,21 +1120,23 @@ class FileSharingApp:
                     self.status_label.config,
                     {"text": f"فایل ذخیره شد در {save_path}", "foreground": "green"},
                 )
-                self.add_to_history("download", remote_file, "success")
+                self.add_to_history("download", remote_file, "success", ts)
 
                 # Show success message to user
-                messagebox.showinfo(
-                    "Success", f"File '{remote_file}' با موفقیت دانلود شد!"
+                self._show_message(
+                    messagebox.showinfo,
+                    "Success",
+                    f"File '{remote_file}' با موفقیت دانلود شد!",
                 )
 
-            # Close SFTP and transport connections
-            sftp.close()
-            transport.close()
-
         except Exception as e:
-            # Handle any errors during transfer process
+            # Handle any errors left after _run_resumable's automatic retries;
+            # this runs on a pool thread whose future is never read, so an
+            # error not reported here would be lost silently
             # Show error message to user
-            messagebox.showerror("Error", f"{action.capitalize()} ناموفق: {e}")
+            self._show_message(
+                messagebox.showerror, "Error", f"{action.capitalize()} ناموفق: {e}"
+            )
 
             # Reset status label
             self.root.after(
@@ -534,15 +1144,7 @@ class FileSharingApp:
             )
 
             # Add failed transfer to history
-            self.add_to_history(
-                action,
-                (
-                    remote_file
-                    if action == "download"
-                    else os.path.basename(self.file_path)
-                ),
-                "failed",
-            )
+            self.add_to_history(action, current_file, "failed", ts)
 
 
 # Main application startup